@@ -1,16 +1,18 @@
 import os
-import json
 import time
 import random
 import re
+import shutil
+import functools
 import requests
 from datetime import datetime, timezone
 from itertools import product
 from urllib.parse import urlparse
 
-import xml.etree.ElementTree
+from lxml import etree
 import dotenv
 import argparse
+import threading
 import concurrent.futures
 
 try:
@@ -20,31 +22,94 @@ try:
 except ImportError:
     pass
 
+# orjson is faster, but the stdlib decoder is good enough if it is missing
+try:
+    import orjson
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps
+except ImportError:
+    import json
+    json_loads = json.loads
+    def json_dumps(obj):
+        return json.dumps(obj).encode('utf-8')
+
+def env_int(name, default, minimum=1):
+    """Reads a positive integer setting from the environment, falling back to default on bad input."""
+    raw = os.environ.get(name)
+    if raw is None:
+        return default
+    try:
+        return max(minimum, int(raw))
+    except ValueError:
+        print(f"[WARN] Ignoring invalid {name}={raw!r}; using {default}")
+        return default
+
 CONFIG_FILE = 'config.json'
 CAPTURES_DIR = 'rss'
-DELAY_RANGE = (1, 3)  # seconds, shorter to keep jobs fast
+# Per-URL ETag/Last-Modified from the last successful capture. Kept outside
+# CAPTURES_DIR so the archive only holds feeds, but committed alongside it so
+# the next (fresh-checkout) run can send conditional requests.
+VALIDATORS_FILE = 'validators.json'
+ALLOWED_DOMAINS = frozenset({"mshibanami.github.io"})
+RATE_LIMIT = 2.0  # requests per second across all workers
 MAX_RETRIES = 3
 BACKOFF_FACTOR = 2
+MAX_BACKOFF = 30  # seconds, ceiling for a single retry wait
 REQUEST_TIMEOUT = 10  # seconds
+# Parallel fetches against the upstream host; override with FETCH_WORKERS.
+# Fetching is I/O-bound and politeness is enforced by the rate limiter, so
+# this is set explicitly instead of the executor's CPU-based default.
+FETCH_CONCURRENCY = env_int('FETCH_WORKERS', 16)
+RATE_BURST = 4  # requests allowed back-to-back before RATE_LIMIT applies
+TELEGRAM_MESSAGE_LIMIT = 3800  # chars, below Telegram's 4096 cap with Markdown headroom
+
+# One pooled session for the whole run so every fetch (and the Telegram
+# notification) reuses kept-alive TCP/TLS connections. The pool is sized to
+# the worker count and blocks when exhausted, so workers wait for a warm
+# connection instead of opening throwaway extra ones to the same host.
+SESSION = requests.Session()
+_adapter = requests.adapters.HTTPAdapter(pool_connections=32, pool_maxsize=FETCH_CONCURRENCY, pool_block=True, max_retries=0)
+SESSION.mount('https://', _adapter)
+SESSION.mount('http://', _adapter)
+SESSION.headers.update({"User-Agent": "Mozilla/5.0 (iPhone; CPU iPhone OS 17_6_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.6 Mobile/15E148 Safari/604.1 OPT/5.0.5"})
+
+@functools.lru_cache(maxsize=None)
+def _real_base(base_dir):
+    # The capture root never moves during a run, so resolve it only once
+    return os.path.realpath(base_dir)
 
 def is_safe_path(base_dir, path):
-    base_dir = os.path.realpath(base_dir)
-    path = os.path.realpath(path)
-    return os.path.commonpath([base_dir]) == os.path.commonpath([base_dir, path])
+    base = _real_base(base_dir)
+    target = os.path.realpath(path)
+    return target == base or target.startswith(base.rstrip(os.sep) + os.sep)
 
 def load_config():
-    with open(CONFIG_FILE, 'r') as f:
-        return json.load(f)
+    with open(CONFIG_FILE, 'rb') as f:
+        return json_loads(f.read())
+
+# Matches both ${var} and {var}; the outer group keeps the raw placeholder
+# so unknown variables are left untouched.
+_VAR_RE = re.compile(r'(\$?\{([^}]+)\})')
+
+@functools.lru_cache(maxsize=None)
+def compile_template(template):
+    """Splits a template once into [literal, placeholder, name, literal, ...]."""
+    return tuple(_VAR_RE.split(template))
+
+def render_template(parts, variables):
+    out = [parts[0]]
+    for i in range(1, len(parts), 3):
+        out.append(str(variables.get(parts[i + 1], parts[i])))
+        out.append(parts[i + 2])
+    return ''.join(out)
 
 def substitute(template, variables):
-    variables = dict(variables)
-    variables['today'] = datetime.now(timezone.utc).strftime('%Y-%m-%d')
-    def replacer(match):
-        var = match.group(1)
-        return str(variables.get(var, match.group(0)))
-    return re.sub(r'\$?\{([^}]+)\}', replacer, template)
+    return render_template(compile_template(template), variables)
 
 def expand_targets(defs, targets):
+    # Resolved once per expansion and threaded through every render
+    today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+
     # Separate fixed and list variables from defs
     fixed_defs = {k: v for k, v in defs.items() if not isinstance(v, list)}
     list_defs = {k: v for k, v in defs.items() if isinstance(v, list)}
@@ -71,40 +136,53 @@ def expand_targets(defs, targets):
     else:
         defs_combinations.append({}) # No list variables in defs, so just one empty combination
 
+    # Split each target's vars and build its combinations once; they do not
+    # depend on the defs combination being rendered.
+    prepared_targets = []
+    for target in targets:
+        # Separate fixed and list variables from target vars
+        target_vars = target.get('vars', {})
+        fixed_target_vars = {k: v for k, v in target_vars.items() if not isinstance(v, list)}
+        list_target_vars = {k: v for k, v in target_vars.items() if isinstance(v, list)}
+
+        # Generate all combinations from target list variables
+        target_combinations = []
+        if list_target_vars:
+            target_list_product_keys = sorted(list(list_target_vars.keys())) # Ensure consistent order
+            target_list_product_values = [list_target_vars[key] for key in target_list_product_keys]
+            for combo_values in product(*target_list_product_values):
+                combo_dict = dict(zip(target_list_product_keys, combo_values))
+                target_combinations.append(combo_dict)
+        else:
+            target_combinations.append({}) # No list variables in target, so just one empty combination
+        prepared_targets.append((
+            compile_template(target.get('filepath', '')),
+            compile_template(target.get('url', '')),
+            fixed_target_vars,
+            target_combinations,
+        ))
+    base_template = compile_template(defs.get('base', ''))
+
     for defs_combo in defs_combinations:
         # Construct the base variables for the current defs combination
-        current_base_vars_for_base_sub = {**fixed_defs, **defs_combo}
+        current_base_vars_for_base_sub = {**fixed_defs, **defs_combo, 'today': today}
         current_base_vars = {**current_base_vars_for_base_sub}
         # Substitute 'base' now that all defs variables are available for this combination
-        current_base_vars['base'] = substitute(defs.get('base', ''), current_base_vars_for_base_sub)
-
-        for target in targets:
-            # Separate fixed and list variables from target vars
-            target_vars = target.get('vars', {})
-            fixed_target_vars = {k: v for k, v in target_vars.items() if not isinstance(v, list)}
-            list_target_vars = {k: v for k, v in target_vars.items() if isinstance(v, list)}
-
-            # Generate all combinations from target list variables
-            target_combinations = []
-            if list_target_vars:
-                target_list_product_keys = sorted(list(list_target_vars.keys())) # Ensure consistent order
-                target_list_product_values = [list_target_vars[key] for key in target_list_product_keys]
-                for combo_values in product(*target_list_product_values):
-                    combo_dict = dict(zip(target_list_product_keys, combo_values))
-                    target_combinations.append(combo_dict)
-            else:
-                target_combinations.append({}) # No list variables in target, so just one empty combination
+        current_base_vars['base'] = render_template(base_template, current_base_vars_for_base_sub)
+
+        for filepath_template, url_template, fixed_target_vars, target_combinations in prepared_targets:
+            # Merge the per-target invariants once into a dict reused for every
+            # combo; all combos of a target share the same keys, so each
+            # update() simply overwrites the previous combo's values.
+            all_vars = {**current_base_vars, **fixed_target_vars}
 
             for target_combo in target_combinations:
-                # Combine all variables for the final substitution
-                all_vars = {
-                    **current_base_vars,
-                    **fixed_target_vars,
-                    **target_combo
-                }
+                all_vars.update(target_combo)
+                # 'today' always wins over user vars, as substitute() used to enforce
+                all_vars['today'] = today
 
-                filepath = substitute(target.get('filepath', ''), all_vars)
-                url = substitute(target.get('url', ''), all_vars)
+                filepath = render_template(filepath_template, all_vars)
+                url = render_template(url_template, all_vars)
 
                 # Extract language for grouping if present in all_vars
                 lang = all_vars.get(list_var_template_names_map.get('langs', 'langs'))
@@ -116,93 +194,225 @@ def expand_targets(defs, targets):
 
     return all_expanded_targets
 
-ALLOWED_DOMAINS = {"mshibanami.github.io"}
-
-def process_language_targets(language_targets):
-    """Processes a list of targets for a single language sequentially."""
-    language_failures = []
-    for entry in language_targets:
-        if 'filepath' not in entry:
-            print(f"[ERROR] Main loop: Entry missing 'filepath': {entry}")
-            language_failures.append({"url": entry.get('url', '[NO URL]'), "filepath": "[MISSING FILEPATH]", "error": "missing filepath"})
-            continue
-        filepath = os.path.join(CAPTURES_DIR, entry['filepath'])
-        if not is_safe_path(CAPTURES_DIR, filepath):
-            print(f"[ERROR] Unsafe filepath detected: {filepath}")
-            language_failures.append({"url": entry.get('url', '[NO URL]'), "filepath": filepath, "error": "unsafe filepath"})
-            continue
-        url = entry.get('url', '[NO URL]')
-        if url == '[NO URL]':
-            print(f"[ERROR] Main loop: Entry missing 'url' for filepath: {filepath}")
-            language_failures.append({"url": "[MISSING URL]", "filepath": filepath, "error": "Missing URL in config entry"})
-            continue
-
-        if os.path.exists(filepath) and os.path.getsize(filepath) > 0:
-            print(f"[INFO] Skipping {url} -> {filepath} (file exists and is non-empty)")
+def existing_nonempty_files(root):
+    """Walks root once and returns the normalized paths of all non-empty files."""
+    seen = set()
+    stack = [root]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
             continue
-
-        print(f"[INFO] Processing {url} -> {filepath}")
-        content = fetch_url(url)
-        if content:
-            ## check if the content is valid xml
-            try:
-                xml.etree.ElementTree.fromstring(content)
-            except xml.etree.ElementTree.ParseError:
-                print(f"[ERROR] Invalid XML content for {url}")
-                language_failures.append({"url": url, "filepath": filepath, "error": "invalid XML"})
-                continue
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file() and entry.stat().st_size > 0:
+                        seen.add(os.path.normpath(entry.path))
+                except OSError:
+                    pass
+    return seen
+
+def load_validators():
+    try:
+        with open(VALIDATORS_FILE, 'rb') as f:
+            validators = json_loads(f.read())
+    except (OSError, ValueError):
+        return {}
+    return validators if isinstance(validators, dict) else {}
+
+def save_validators(validators):
+    folder = os.path.dirname(VALIDATORS_FILE)
+    if folder:
+        ensure_dir(folder)
+    with open(VALIDATORS_FILE, 'wb') as f:
+        f.write(json_dumps(validators))
+
+# lxml parsers must not be shared between threads, so each worker keeps its own
+_XML_LOCAL = threading.local()
+
+def parse_xml(content):
+    """Parses feed bytes with libxml2; internal entities are expanded, external ones and network access refused."""
+    parser = getattr(_XML_LOCAL, 'parser', None)
+    if parser is None:
+        parser = _XML_LOCAL.parser = etree.XMLParser(resolve_entities='internal', no_network=True, remove_comments=True, remove_pis=True)
+    return etree.fromstring(content, parser=parser)
+
+def needs_fetch(entry, existing):
+    """False when the entry's capture already exists and is non-empty; malformed entries pass through."""
+    if 'filepath' not in entry:
+        return True
+    filepath = os.path.join(CAPTURES_DIR, entry['filepath'])
+    if os.path.normpath(filepath) in existing:
+        print(f"[INFO] Skipping {entry.get('url', '[NO URL]')} -> {filepath} (file exists and is non-empty)")
+        return False
+    return True
+
+def is_usable_capture(cached_path, filepath):
+    """True if cached_path is a safe, non-empty file other than filepath to copy on a 304."""
+    if not isinstance(cached_path, str) or not is_safe_path(CAPTURES_DIR, cached_path):
+        return False
+    if os.path.normpath(cached_path) == os.path.normpath(filepath):
+        return False
+    try:
+        return os.path.isfile(cached_path) and os.path.getsize(cached_path) > 0
+    except OSError:
+        return False
+
+def process_entry(entry, validators):
+    """Fetches, validates and saves a single target. Returns a failure dict or None."""
+    if 'filepath' not in entry:
+        print(f"[ERROR] Main loop: Entry missing 'filepath': {entry}")
+        return {"url": entry.get('url', '[NO URL]'), "filepath": "[MISSING FILEPATH]", "error": "missing filepath"}
+    filepath = os.path.join(CAPTURES_DIR, entry['filepath'])
+    if not is_safe_path(CAPTURES_DIR, filepath):
+        print(f"[ERROR] Unsafe filepath detected: {filepath}")
+        return {"url": entry.get('url', '[NO URL]'), "filepath": filepath, "error": "unsafe filepath"}
+    url = entry.get('url', '[NO URL]')
+    if url == '[NO URL]':
+        print(f"[ERROR] Main loop: Entry missing 'url' for filepath: {filepath}")
+        return {"url": "[MISSING URL]", "filepath": filepath, "error": "Missing URL in config entry"}
+
+    netloc = urlparse(url).netloc
+    if netloc not in ALLOWED_DOMAINS:
+        print(f"[ERROR] Refusing to fetch from unauthorized domain: {netloc}")
+        return {"url": url, "filepath": filepath, "error": "unauthorized domain"}
+
+    # Only revalidate against a different, non-empty previous capture still on disk
+    cached = validators.get(url)
+    if not (isinstance(cached, dict) and is_usable_capture(cached.get('filepath'), filepath)):
+        cached = None
+
+    print(f"[INFO] Processing {url} -> {filepath}")
+    failure = None
+    resp = fetch_url(url, cached)
+    if resp is not None and resp.status_code == 304:
+        shutil.copyfile(cached['filepath'], filepath)
+        print(f"[INFO] Not modified: copied {cached['filepath']} to {filepath}")
+        validators[url] = {**cached, "filepath": filepath}
+        return None
+    content = resp.content if resp is not None else None
+    if content:
+        ## check if the content is valid xml, keeping the tree for minifying
+        try:
+            root = parse_xml(content)
+        except etree.XMLSyntaxError:
+            print(f"[ERROR] Invalid XML content for {url}")
+            failure = {"url": url, "filepath": filepath, "error": "invalid XML"}
+        else:
             ## minify the xml
-            content = xml.etree.ElementTree.fromstring(content)
-            content = xml.etree.ElementTree.tostring(content, encoding='utf-8').decode('utf-8')
+            content = etree.tostring(root, encoding='utf-8')
             save_content(os.path.dirname(filepath), os.path.basename(filepath), content)
             print(f"[INFO] Saved content for {url} to {filepath}")
-        else:
-            print(f"[ERROR] Failed to fetch content for {url}")
-            language_failures.append({"url": url, "filepath": filepath, "error": "fetch failed"})
-
-        delay = random.uniform(*DELAY_RANGE)
-        print(f"[INFO] Sleeping for {delay:.2f} seconds...")
-        time.sleep(delay)
-    return language_failures
-
-def fetch_url(url):
-    parsed = urlparse(url)
-    if parsed.netloc not in ALLOWED_DOMAINS:
-        print(f"[ERROR] Refusing to fetch from unauthorized domain: {parsed.netloc}")
-        return None
-    headers = {"User-Agent": "Mozilla/5.0 (iPhone; CPU iPhone OS 17_6_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.6 Mobile/15E148 Safari/604.1 OPT/5.0.5"}
+            etag = resp.headers.get('ETag')
+            last_modified = resp.headers.get('Last-Modified')
+            if etag or last_modified:
+                validators[url] = {"etag": etag, "last_modified": last_modified, "filepath": filepath}
+    else:
+        print(f"[ERROR] Failed to fetch content for {url}")
+        failure = {"url": url, "filepath": filepath, "error": "fetch failed"}
+    return failure
+
+class TokenBucket:
+    """Thread-safe token bucket admitting at most `rate` requests per second after a burst."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        # Reserve a token under the lock (possibly going negative), then sleep
+        # outside it so waiting callers queue up in order without blocking.
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+RATE_LIMITER = TokenBucket(RATE_LIMIT, RATE_BURST)
+
+def backoff_delay(attempt, retry_after=None):
+    """Returns seconds to wait before retrying: Retry-After if given, else full jitter; never above MAX_BACKOFF."""
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), MAX_BACKOFF)
+    return random.uniform(0, min(MAX_BACKOFF, BACKOFF_FACTOR ** attempt))
+
+def fetch_url(url, cached=None):
+    """Returns the response on 200 (or 304 when `cached` validators are sent), else None."""
+    # Only URLs on ALLOWED_DOMAINS reach here; process_entry refuses the rest
+    headers = {}
+    if cached:
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
     for attempt in range(1, MAX_RETRIES + 1):
         try:
-            resp = requests.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
-            if resp.status_code == 200:
-                return resp.text
+            RATE_LIMITER.take()
+            resp = SESSION.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+            if resp.status_code == 200 or (resp.status_code == 304 and headers):
+                return resp
             elif resp.status_code in (429, 500, 502, 503, 504):
                 print(f"[WARN] Retrying {url} due to status {resp.status_code} (attempt {attempt}/{MAX_RETRIES})")
-                time.sleep(BACKOFF_FACTOR ** attempt)
+                if attempt < MAX_RETRIES:
+                    time.sleep(backoff_delay(attempt, resp.headers.get('Retry-After')))
             else:
                 print(f"[ERROR] Non-retryable error {resp.status_code} for {url}")
                 return None
         except requests.exceptions.RequestException as e_req:
             print(f"[ERROR] RequestException during fetch for {url} (attempt {attempt}/{MAX_RETRIES}): {e_req}")
-            time.sleep(BACKOFF_FACTOR ** attempt)
+            if attempt < MAX_RETRIES:
+                time.sleep(backoff_delay(attempt))
     print(f"[ERROR] Failed to fetch {url} after {MAX_RETRIES} attempts.")
     return None
 
+# Directories already created this run; lets save_content skip makedirs.
+_CREATED_DIRS = set()
+
+def ensure_dir(folder):
+    if folder not in _CREATED_DIRS:
+        os.makedirs(folder, exist_ok=True)
+        _CREATED_DIRS.add(folder)
+
 def save_content(folder, filename, content):
-    os.makedirs(folder, exist_ok=True)
+    """Writes already-encoded bytes, skipping a text-mode encode pass."""
+    ensure_dir(folder)
     file_path = os.path.join(folder, filename)
-    with open(file_path, 'w', encoding='utf-8') as f:
+    with open(file_path, 'wb') as f:
         f.write(content)
 
-def generate_folders(defs, targets):
-    expanded = expand_targets(defs, targets)
+def generate_folders(expanded):
+    folders = set()
     for entry in expanded:
         if 'filepath' not in entry:
             print(f"[ERROR] Entry missing 'filepath': {entry}")
             continue
-        filepath = os.path.join(CAPTURES_DIR, entry['filepath'])
-        print(f"[INFO] Creating parent directory for: {filepath}")
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        folders.add(os.path.dirname(os.path.join(CAPTURES_DIR, entry['filepath'])))
+    for folder in sorted(folders):
+        print(f"[INFO] Creating directory: {folder}")
+        ensure_dir(folder)
+
+def chunk_lines(lines, limit):
+    """Groups lines into newline-joined chunks of at most `limit` characters."""
+    buf = []
+    size = 0  # length of '\n'.join(buf)
+    for line in lines:
+        line = line[:limit]
+        if buf and size + 1 + len(line) > limit:
+            yield '\n'.join(buf)
+            buf = []
+            size = 0
+        size += len(line) + (1 if buf else 0)
+        buf.append(line)
+    if buf:
+        yield '\n'.join(buf)
 
 def send_telegram_message(message):
     token = os.environ.get('TELEGRAM_BOT_TOKEN')
@@ -211,13 +421,16 @@ def send_telegram_message(message):
         print("Telegram bot token or chat ID not set; skipping notification.")
         return
     url = f"https://api.telegram.org/bot{token}/sendMessage"
-    data = {"chat_id": chat_id, "text": message, "parse_mode": "Markdown"}
-    try:
-        resp = requests.post(url, data=data, timeout=REQUEST_TIMEOUT)
-        if resp.status_code != 200:
-            print(f"Failed to send Telegram message: {resp.text}")
-    except Exception as e:
-        print(f"Exception sending Telegram message: {e}")
+    # Telegram rejects texts over 4096 chars, so long reports go out as
+    # several line-aligned messages over the same kept-alive session.
+    for chunk in chunk_lines(message.split('\n'), TELEGRAM_MESSAGE_LIMIT):
+        data = {"chat_id": chat_id, "text": chunk, "parse_mode": "Markdown"}
+        try:
+            resp = SESSION.post(url, data=data, timeout=REQUEST_TIMEOUT)
+            if resp.status_code != 200:
+                print(f"Failed to send Telegram message: {resp.text}")
+        except Exception as e:
+            print(f"Exception sending Telegram message: {e}")
 
 def main():
     parser = argparse.ArgumentParser()
@@ -231,9 +444,9 @@ def main():
     defs = config.get('defs', {})
     targets = config.get('target', [])
 
-    # Generate folders for all potential targets initially
-    generate_folders(defs, targets)
+    # Expand once and generate folders for all potential targets initially
     expanded = expand_targets(defs, targets)
+    generate_folders(expanded)
 
     if args.test:
         if args.random:
@@ -265,36 +478,38 @@ def main():
     if not expanded:
         print("[INFO] No items to process.")
 
-    # Group targets by language
-    language_groups = {}
-    for entry in expanded:
-        lang = entry.get('lang', 'default')  # Use 'default' if no language is specified
-        if lang not in language_groups:
-            language_groups[lang] = []
-        language_groups[lang].append(entry)
-
-    # Process each language group in parallel using ThreadPoolExecutor
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        future_to_lang = {
-            executor.submit(process_language_targets, targets_for_lang):
-            lang for lang, targets_for_lang in language_groups.items()
-        }
-        for future in concurrent.futures.as_completed(future_to_lang):
-            lang = future_to_lang[future]
+    # One directory walk replaces an exists()+getsize() pair per target
+    existing = existing_nonempty_files(CAPTURES_DIR)
+    # Drop already-captured targets before dispatch so workers only see real fetches
+    expanded = [entry for entry in expanded if needs_fetch(entry, existing)]
+    validators = load_validators()
+    loaded_validators = dict(validators)
+
+    # Fetch every target on one bounded pool; FETCH_CONCURRENCY caps the
+    # number of in-flight requests against the (single) upstream host.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=FETCH_CONCURRENCY) as executor:
+        future_to_entry = {executor.submit(process_entry, entry, validators): entry for entry in expanded}
+        for future in concurrent.futures.as_completed(future_to_entry):
+            entry = future_to_entry[future]
             try:
-                language_failures = future.result()
-                failures.extend(language_failures)
-                print(f"[INFO] Finished processing language group: {lang}")
+                failure = future.result()
+                if failure:
+                    failures.append(failure)
             except Exception as exc:
-                print(f"[ERROR] Language group {lang} generated an exception: {exc}")
-                failures.append({"language": lang, "error": str(exc), "type": "thread_exception"})
+                print(f"[ERROR] Processing {entry.get('url', '[NO URL]')} generated an exception: {exc}")
+                failures.append({"url": entry.get('url', '[NO URL]'), "filepath": entry.get('filepath', 'unknown'), "error": str(exc), "type": "thread_exception"})
+
+    # Only rewrite the tracked cache when this run actually changed it
+    if validators != loaded_validators:
+        save_validators(validators)
 
     if failures:
         msg_lines = [f"*Capture Failures* ({datetime.now(timezone.utc).isoformat()} UTC):"]
         for f in failures:
-            msg_lines.append(f"- `{f.get('url', f.get('language', 'unknown'))}` for `{f.get('filepath', 'unknown')}`: {f['error']}")
+            msg_lines.append(f"- `{f.get('url', 'unknown')}` for `{f.get('filepath', 'unknown')}`: {f['error']}")
         send_telegram_message('\n'.join(msg_lines))
 
+    SESSION.close()
     print("[INFO] Script finished.")
 
 if __name__ == '__main__':